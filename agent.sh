@@ -1,10 +1,60 @@
 #!/bin/bash
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+CONTEXT_LABEL="io.github.rntk.code-agents-docker.context"
+
 execute() {
     echo -e "\033[1;34m[EXECUTING]\033[0m: $*"
     "$@"
 }
 
+# Hash of a build context plus its locked build args.
+# Must stay in sync with context_hash() in scripts/sync_agents.py.
+context_hash() {
+    local dir="$1" build_args="$2"
+    {
+        (cd "$dir" && find . -type f ! -name '*.md' ! -path '*/__pycache__/*' -print0 \
+            | LC_ALL=C sort -z | xargs -0 -r sha256sum)
+        printf '%s\n' "$build_args"
+    } | sha256sum | cut -d' ' -f1
+}
+
+# Prints --label flags for docker build: <context dir> <build args> <version>
+# "created" is the commit time, not the build time, so cached rebuilds keep the same image ID.
+image_labels() {
+    local revision created
+    revision=$(git -C "$SCRIPT_DIR" rev-parse HEAD 2>/dev/null)
+    created=$(git -C "$SCRIPT_DIR" show -s --format=%cI HEAD 2>/dev/null)
+    echo "--label $CONTEXT_LABEL=$(context_hash "$1" "$2")"
+    echo "--label org.opencontainers.image.version=$3"
+    [ -n "$created" ] && echo "--label org.opencontainers.image.created=$created"
+    [ -n "$revision" ] && echo "--label org.opencontainers.image.revision=$revision"
+}
+
+# Compares <id>:latest's context label with the working tree before launching.
+# AGENT_STALE=warn (default) only warns, rebuild rebuilds stale images, ignore skips the check.
+check_image() {
+    local index="$1" id="$2" dir="$3" build_args="$4"
+    local mode="${AGENT_STALE:-warn}"
+    [ "$mode" = "ignore" ] && return 0
+    [ -d "$SCRIPT_DIR/$dir" ] || return 0
+
+    local built
+    if ! built=$(sudo docker image inspect --format "{{ index .Config.Labels \"$CONTEXT_LABEL\" }}" "$id:latest" 2>/dev/null); then
+        echo -e "\033[1;33m[STALE]\033[0m $id:latest does not exist."
+    elif [ "$built" = "$(context_hash "$SCRIPT_DIR/$dir" "$build_args")" ]; then
+        return 0
+    else
+        echo -e "\033[1;33m[STALE]\033[0m $id:latest was not built from the current $dir."
+    fi
+
+    if [ "$mode" = "rebuild" ]; then
+        (cd "$SCRIPT_DIR" && build_choice "$index")
+    else
+        echo "  Rebuild with: $0 build (or set AGENT_STALE=rebuild)"
+    fi
+}
+
 # BEGIN GENERATED AGENT COUNT
 AGENT_COUNT=14
 # END GENERATED AGENT COUNT
@@ -32,20 +82,20 @@ run_agent() {
 
     case "$choice" in
         # BEGIN GENERATED RUN CASE
-        1) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.claude:/home/ubuntu/.claude" -v "$HOME/.claude/.claude.json:/home/ubuntu/.claude.json" -e ANTHROPIC_API_KEY="${ANTHROPIC_API_KEY}" claude-code:latest --verbose --dangerously-skip-permissions ;;
-        2) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.codex:/home/node/.codex" -e OPENAI_API_KEY="${OPENAI_API_KEY}" codex-cli:latest -a never --sandbox danger-full-access ;;
-        3) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.copilot:/home/node/.copilot" -e COPILOT_GITHUB_TOKEN="${COPILOT_GITHUB_TOKEN}" copilot-cli:latest --allow-all ;;
-        4) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.codespeak:/home/codespeak/.codespeak" -e ANTHROPIC_API_KEY="${ANTHROPIC_API_KEY}" --entrypoint /bin/bash codespeak:latest ;;
-        5) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.vibe:/root/.vibe" -e MISTRAL_API_KEY="${MISTRAL_API_KEY}" devstral-cli:latest --agent=auto-approve ;;
-        6) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.junie:/home/ubuntu/.junie" -e JUNIE_API_KEY="${JUNIE_API_KEY}" junie-cli:latest --brave ;;
-        7) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.kimi:/home/appuser/.kimi" kimi-cli:latest --yolo ;;
-        8) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.kiro:/home/ubuntu/.kiro" -v "$HOME/.local/share/kiro-cli:/home/ubuntu/.local/share/kiro-cli" kiro-cli:latest chat --trust-all-tools ;;
-        9) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.qwen:/home/node/.qwen" qwen-code:latest --yolo ;;
-        10) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.opencode:/home/node/.opencode" -v "$HOME/.config/opencode:/home/node/.config/opencode" opencode-cli:latest ;;
-        11) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.pi:/home/node/.pi" pi-coding-agent:latest ;;
-        12) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.cursor:/home/ubuntu/.cursor" -v "$HOME/.config/cursor:/home/ubuntu/.config/cursor" cursor-cli:latest --sandbox disabled --yolo ;;
-        13) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.gemini:/home/ubuntu/.gemini" -v "$HOME/.config/Antigravity:/home/ubuntu/.config/Antigravity" -v "$HOME/.config/Antigravity IDE:/home/ubuntu/.config/Antigravity IDE" antigravity-cli:latest --dangerously-skip-permissions ;;
-        14) execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.grok:/home/ubuntu/.grok" -v "$HOME/.agents:/home/ubuntu/.agents" -e XAI_API_KEY="${XAI_API_KEY}" grok-build-cli:latest --always-approve ;;
+        1) check_image 1 claude-code agents/claude-code '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.claude:/home/ubuntu/.claude" -v "$HOME/.claude/.claude.json:/home/ubuntu/.claude.json" -e ANTHROPIC_API_KEY="${ANTHROPIC_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} claude-code:latest --verbose --dangerously-skip-permissions ;;
+        2) check_image 2 codex-cli agents/codex-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.codex:/home/node/.codex" -e OPENAI_API_KEY="${OPENAI_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} codex-cli:latest -a never --sandbox danger-full-access ;;
+        3) check_image 3 copilot-cli agents/copilot-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.copilot:/home/node/.copilot" -e COPILOT_GITHUB_TOKEN="${COPILOT_GITHUB_TOKEN}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} -e NODE_OPTIONS="--max-old-space-size=${AGENT_NODE_HEAP_MB:-4096}" copilot-cli:latest --allow-all ;;
+        4) check_image 4 codespeak agents/codespeak '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.codespeak:/home/codespeak/.codespeak" -e ANTHROPIC_API_KEY="${ANTHROPIC_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} --entrypoint /bin/bash codespeak:latest ;;
+        5) check_image 5 devstral-cli agents/devstral-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.vibe:/root/.vibe" -e MISTRAL_API_KEY="${MISTRAL_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} devstral-cli:latest --agent=auto-approve ;;
+        6) check_image 6 junie-cli agents/junie-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.junie:/home/ubuntu/.junie" -e JUNIE_API_KEY="${JUNIE_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} junie-cli:latest --brave ;;
+        7) check_image 7 kimi-cli agents/kimi-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.kimi:/home/appuser/.kimi" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} kimi-cli:latest --yolo ;;
+        8) check_image 8 kiro-cli agents/kiro-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.kiro:/home/ubuntu/.kiro" -v "$HOME/.local/share/kiro-cli:/home/ubuntu/.local/share/kiro-cli" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} kiro-cli:latest chat --trust-all-tools ;;
+        9) check_image 9 qwen-code agents/qwen-code '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.qwen:/home/node/.qwen" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} -e NODE_OPTIONS="--max-old-space-size=${AGENT_NODE_HEAP_MB:-4096}" qwen-code:latest --yolo ;;
+        10) check_image 10 opencode-cli agents/opencode-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.opencode:/home/node/.opencode" -v "$HOME/.config/opencode:/home/node/.config/opencode" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} opencode-cli:latest ;;
+        11) check_image 11 pi-coding-agent agents/pi-coding-agent '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.pi:/home/node/.pi" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} -e NODE_OPTIONS="--max-old-space-size=${AGENT_NODE_HEAP_MB:-4096}" pi-coding-agent:latest ;;
+        12) check_image 12 cursor-cli agents/cursor-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.cursor:/home/ubuntu/.cursor" -v "$HOME/.config/cursor:/home/ubuntu/.config/cursor" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} cursor-cli:latest --sandbox disabled --yolo ;;
+        13) check_image 13 antigravity-cli agents/antigravity-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.gemini:/home/ubuntu/.gemini" -v "$HOME/.config/Antigravity:/home/ubuntu/.config/Antigravity" -v "$HOME/.config/Antigravity IDE:/home/ubuntu/.config/Antigravity IDE" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} antigravity-cli:latest --dangerously-skip-permissions ;;
+        14) check_image 14 grok-build-cli agents/grok-build-cli '' && execute sudo docker run --rm -it -v "$(pwd):/app" -v "$HOME/.grok:/home/ubuntu/.grok" -v "$HOME/.agents:/home/ubuntu/.agents" -e XAI_API_KEY="${XAI_API_KEY}" ${AGENT_CPUS:+--cpus "$AGENT_CPUS"} ${AGENT_MEMORY:+--memory "$AGENT_MEMORY"} ${AGENT_SHM_SIZE:+--shm-size "$AGENT_SHM_SIZE"} grok-build-cli:latest --always-approve ;;
         *) echo "Invalid selection" ; exit 1 ;;
 # END GENERATED RUN CASE
     esac
@@ -71,23 +121,26 @@ build_agent() {
 # END GENERATED BUILD MENU
 
     read -rp "Select agent to build (1-${AGENT_COUNT}): " choice
+    build_choice "$choice"
+}
 
-    case "$choice" in
+build_choice() {
+    case "$1" in
         # BEGIN GENERATED BUILD CASE
-        1) execute docker build --no-cache -t claude-code:latest agents/claude-code ;;
-        2) execute docker build --no-cache -t codex-cli:latest agents/codex-cli ;;
-        3) execute docker build --no-cache -t copilot-cli:latest agents/copilot-cli ;;
-        4) execute docker build --no-cache -t codespeak:latest agents/codespeak ;;
-        5) execute docker build --no-cache -t devstral-cli:latest agents/devstral-cli ;;
-        6) execute docker build --no-cache -t junie-cli:latest agents/junie-cli ;;
-        7) execute docker build --no-cache -t kimi-cli:latest agents/kimi-cli ;;
-        8) execute docker build --no-cache -t kiro-cli:latest agents/kiro-cli ;;
-        9) execute docker build --no-cache -t qwen-code:latest agents/qwen-code ;;
-        10) execute docker build --no-cache -t opencode-cli:latest agents/opencode-cli ;;
-        11) execute docker build --no-cache -t pi-coding-agent:latest agents/pi-coding-agent ;;
-        12) execute docker build --no-cache -t cursor-cli:latest agents/cursor-cli ;;
-        13) execute docker build --no-cache -t antigravity-cli:latest agents/antigravity-cli ;;
-        14) execute docker build --no-cache -t grok-build-cli:latest agents/grok-build-cli ;;
+        1) execute docker build --no-cache $(image_labels agents/claude-code '' latest) -t claude-code:latest agents/claude-code ;;
+        2) execute docker build --no-cache $(image_labels agents/codex-cli '' latest) -t codex-cli:latest agents/codex-cli ;;
+        3) execute docker build --no-cache $(image_labels agents/copilot-cli '' latest) -t copilot-cli:latest agents/copilot-cli ;;
+        4) execute docker build --no-cache $(image_labels agents/codespeak '' latest) -t codespeak:latest agents/codespeak ;;
+        5) execute docker build --no-cache $(image_labels agents/devstral-cli '' latest) -t devstral-cli:latest agents/devstral-cli ;;
+        6) execute docker build --no-cache $(image_labels agents/junie-cli '' latest) -t junie-cli:latest agents/junie-cli ;;
+        7) execute docker build --no-cache $(image_labels agents/kimi-cli '' latest) -t kimi-cli:latest agents/kimi-cli ;;
+        8) execute docker build --no-cache $(image_labels agents/kiro-cli '' latest) -t kiro-cli:latest agents/kiro-cli ;;
+        9) execute docker build --no-cache $(image_labels agents/qwen-code '' latest) -t qwen-code:latest agents/qwen-code ;;
+        10) execute docker build --no-cache $(image_labels agents/opencode-cli '' latest) -t opencode-cli:latest agents/opencode-cli ;;
+        11) execute docker build --no-cache $(image_labels agents/pi-coding-agent '' latest) -t pi-coding-agent:latest agents/pi-coding-agent ;;
+        12) execute docker build --no-cache $(image_labels agents/cursor-cli '' latest) -t cursor-cli:latest agents/cursor-cli ;;
+        13) execute docker build --no-cache $(image_labels agents/antigravity-cli '' latest) -t antigravity-cli:latest agents/antigravity-cli ;;
+        14) execute docker build --no-cache $(image_labels agents/grok-build-cli '' latest) -t grok-build-cli:latest agents/grok-build-cli ;;
         *) echo "Unknown agent" ; exit 1 ;;
 # END GENERATED BUILD CASE
     esac
@@ -100,33 +153,33 @@ rebuild_all() {
 
     # BEGIN GENERATED REBUILD ALL CASE
     echo "[1/14] claude-code"
-    execute docker build --no-cache -t claude-code:latest agents/claude-code && succeeded+=("claude-code") || failed+=("claude-code")
+    execute docker build --no-cache $(image_labels agents/claude-code '' latest) -t claude-code:latest agents/claude-code && succeeded+=("claude-code") || failed+=("claude-code")
     echo "[2/14] codex-cli"
-    execute docker build --no-cache -t codex-cli:latest agents/codex-cli && succeeded+=("codex-cli") || failed+=("codex-cli")
+    execute docker build --no-cache $(image_labels agents/codex-cli '' latest) -t codex-cli:latest agents/codex-cli && succeeded+=("codex-cli") || failed+=("codex-cli")
     echo "[3/14] copilot-cli"
-    execute docker build --no-cache -t copilot-cli:latest agents/copilot-cli && succeeded+=("copilot-cli") || failed+=("copilot-cli")
+    execute docker build --no-cache $(image_labels agents/copilot-cli '' latest) -t copilot-cli:latest agents/copilot-cli && succeeded+=("copilot-cli") || failed+=("copilot-cli")
     echo "[4/14] codespeak"
-    execute docker build --no-cache -t codespeak:latest agents/codespeak && succeeded+=("codespeak") || failed+=("codespeak")
+    execute docker build --no-cache $(image_labels agents/codespeak '' latest) -t codespeak:latest agents/codespeak && succeeded+=("codespeak") || failed+=("codespeak")
     echo "[5/14] devstral-cli"
-    execute docker build --no-cache -t devstral-cli:latest agents/devstral-cli && succeeded+=("devstral-cli") || failed+=("devstral-cli")
+    execute docker build --no-cache $(image_labels agents/devstral-cli '' latest) -t devstral-cli:latest agents/devstral-cli && succeeded+=("devstral-cli") || failed+=("devstral-cli")
     echo "[6/14] junie-cli"
-    execute docker build --no-cache -t junie-cli:latest agents/junie-cli && succeeded+=("junie-cli") || failed+=("junie-cli")
+    execute docker build --no-cache $(image_labels agents/junie-cli '' latest) -t junie-cli:latest agents/junie-cli && succeeded+=("junie-cli") || failed+=("junie-cli")
     echo "[7/14] kimi-cli"
-    execute docker build --no-cache -t kimi-cli:latest agents/kimi-cli && succeeded+=("kimi-cli") || failed+=("kimi-cli")
+    execute docker build --no-cache $(image_labels agents/kimi-cli '' latest) -t kimi-cli:latest agents/kimi-cli && succeeded+=("kimi-cli") || failed+=("kimi-cli")
     echo "[8/14] kiro-cli"
-    execute docker build --no-cache -t kiro-cli:latest agents/kiro-cli && succeeded+=("kiro-cli") || failed+=("kiro-cli")
+    execute docker build --no-cache $(image_labels agents/kiro-cli '' latest) -t kiro-cli:latest agents/kiro-cli && succeeded+=("kiro-cli") || failed+=("kiro-cli")
     echo "[9/14] qwen-code"
-    execute docker build --no-cache -t qwen-code:latest agents/qwen-code && succeeded+=("qwen-code") || failed+=("qwen-code")
+    execute docker build --no-cache $(image_labels agents/qwen-code '' latest) -t qwen-code:latest agents/qwen-code && succeeded+=("qwen-code") || failed+=("qwen-code")
     echo "[10/14] opencode-cli"
-    execute docker build --no-cache -t opencode-cli:latest agents/opencode-cli && succeeded+=("opencode-cli") || failed+=("opencode-cli")
+    execute docker build --no-cache $(image_labels agents/opencode-cli '' latest) -t opencode-cli:latest agents/opencode-cli && succeeded+=("opencode-cli") || failed+=("opencode-cli")
     echo "[11/14] pi-coding-agent"
-    execute docker build --no-cache -t pi-coding-agent:latest agents/pi-coding-agent && succeeded+=("pi-coding-agent") || failed+=("pi-coding-agent")
+    execute docker build --no-cache $(image_labels agents/pi-coding-agent '' latest) -t pi-coding-agent:latest agents/pi-coding-agent && succeeded+=("pi-coding-agent") || failed+=("pi-coding-agent")
     echo "[12/14] cursor-cli"
-    execute docker build --no-cache -t cursor-cli:latest agents/cursor-cli && succeeded+=("cursor-cli") || failed+=("cursor-cli")
+    execute docker build --no-cache $(image_labels agents/cursor-cli '' latest) -t cursor-cli:latest agents/cursor-cli && succeeded+=("cursor-cli") || failed+=("cursor-cli")
     echo "[13/14] antigravity-cli"
-    execute docker build --no-cache -t antigravity-cli:latest agents/antigravity-cli && succeeded+=("antigravity-cli") || failed+=("antigravity-cli")
+    execute docker build --no-cache $(image_labels agents/antigravity-cli '' latest) -t antigravity-cli:latest agents/antigravity-cli && succeeded+=("antigravity-cli") || failed+=("antigravity-cli")
     echo "[14/14] grok-build-cli"
-    execute docker build --no-cache -t grok-build-cli:latest agents/grok-build-cli && succeeded+=("grok-build-cli") || failed+=("grok-build-cli")
+    execute docker build --no-cache $(image_labels agents/grok-build-cli '' latest) -t grok-build-cli:latest agents/grok-build-cli && succeeded+=("grok-build-cli") || failed+=("grok-build-cli")
 # END GENERATED REBUILD ALL CASE
 
     echo ""
@@ -1,13 +1,137 @@
 #!/usr/bin/env python3
+import collections
+import email.utils
 import http.server
 import http.client
+import os
+import re
 import sys
+import threading
+import time
 
 # Configuration
 LISTEN_PORT = 8081
 TARGET_HOST = 'localhost'
 TARGET_PORT = 8080
 
+# Optional response cache for static GET responses (disabled when the total size is 0)
+CACHE_MAX_BYTES = int(os.environ.get('AUTH_PROXY_CACHE_MAX_BYTES', 0))
+CACHE_ENTRY_MAX_BYTES = int(os.environ.get('AUTH_PROXY_CACHE_ENTRY_MAX_BYTES', 1024 * 1024))
+
+# Headers that describe the connection rather than the response
+HOP_BY_HOP_HEADERS = ['transfer-encoding', 'connection']
+# Headers a 304 Not Modified response carries over from the cached response
+NOT_MODIFIED_HEADERS = ['cache-control', 'content-location', 'date', 'etag', 'expires', 'last-modified', 'vary']
+
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, arg = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def parse_http_date(value):
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class CacheEntry:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.body = body
+        self.update(headers)
+
+    def update(self, headers):
+        self.headers = headers
+        lookup = {name.lower(): value for name, value in headers}
+        self.etag = lookup.get('etag')
+        self.last_modified = lookup.get('last-modified')
+        directives = parse_cache_control(lookup.get('cache-control'))
+        lifetime = 0
+        if 'no-cache' not in directives:
+            max_age = directives.get('s-maxage') or directives.get('max-age')
+            if max_age is not None:
+                lifetime = int(max_age) if max_age.isdigit() else 0
+            elif 'expires' in lookup:
+                expires = parse_http_date(lookup['expires'])
+                date = parse_http_date(lookup.get('date')) or time.time()
+                lifetime = max(0, expires - date) if expires else 0
+        self.fresh_until = time.monotonic() + lifetime
+
+    def is_fresh(self):
+        return time.monotonic() < self.fresh_until
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of response bodies keyed by request path and encoding."""
+
+    def __init__(self, max_bytes, entry_max_bytes):
+        self.max_bytes = max_bytes
+        self.entry_max_bytes = entry_max_bytes
+        self.size = 0
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry.body) > self.entry_max_bytes or len(entry.body) > self.max_bytes:
+            return False
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+        return True
+
+    def discard(self, key):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+
+
+CACHE = ResponseCache(CACHE_MAX_BYTES, CACHE_ENTRY_MAX_BYTES) if CACHE_MAX_BYTES > 0 else None
+
+
+def is_cacheable(response):
+    if response.status != 200:
+        return False
+    if response.getheader('Set-Cookie') is not None:
+        return False
+    directives = parse_cache_control(response.getheader('Cache-Control'))
+    if 'no-store' in directives or 'private' in directives:
+        return False
+    vary = [v.strip().lower() for v in (response.getheader('Vary') or '').split(',') if v.strip()]
+    if any(v != 'accept-encoding' for v in vary):
+        return False
+    # Without a validator or an explicit lifetime there is nothing to revalidate against
+    has_validator = response.getheader('ETag') or response.getheader('Last-Modified')
+    return bool(has_validator or 'max-age' in directives or 's-maxage' in directives)
+
+
+def etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = [tag.strip().removeprefix('W/') for tag in re.findall(r'(?:W/)?"[^"]*"', header)]
+    return etag.removeprefix('W/') in candidates
+
+
 class ProxyHandler(http.server.BaseHTTPRequestHandler):
     def do_GET(self):
         self.proxy_request('GET')
@@ -17,35 +141,120 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
 
     def proxy_request(self, method):
         try:
+            # Credentialed requests (API tokens or session cookies) are never cached or replayed
+            credentialed = 'Authorization' in self.headers or 'Cookie' in self.headers
+            if method == 'GET' and CACHE is not None and not credentialed:
+                self.proxy_cached_get()
+                return
+
             # Prepare connection to the local tool server
             conn = http.client.HTTPConnection(TARGET_HOST, TARGET_PORT)
-            
+
             # Read body if it's a POST request
             content_length = int(self.headers.get('Content-Length', 0))
             body = self.rfile.read(content_length) if content_length > 0 else None
-            
+
             # Forward the request
             conn.request(method, self.path, body, self.headers)
             response = conn.getresponse()
-            
+
             # Send response back to the browser
             self.send_response(response.status)
             for header, value in response.getheaders():
                 # Avoid passing through transfer-encoding or connection headers that might conflict
-                if header.lower() not in ['transfer-encoding', 'connection']:
+                if header.lower() not in HOP_BY_HOP_HEADERS:
                     self.send_header(header, value)
             self.end_headers()
             self.wfile.write(response.read())
-            
+
         except ConnectionRefusedError:
             self.send_error(502, f"Target {TARGET_HOST}:{TARGET_PORT} is not responding. Is the tool running?")
         except Exception as e:
             self.send_error(500, f"Proxy error: {str(e)}")
 
+    def proxy_cached_get(self):
+        key = (self.path, self.headers.get('Accept-Encoding', ''))
+        entry = CACHE.get(key)
+        client_no_cache = 'no-cache' in parse_cache_control(self.headers.get('Cache-Control'))
+        if entry is not None and entry.is_fresh() and not client_no_cache:
+            self.send_cached(entry)
+            return
+
+        headers = self.headers
+        if entry is not None:
+            # Revalidate with our own validators instead of the browser's
+            headers = {
+                name: value for name, value in self.headers.items()
+                if name.lower() not in ('if-none-match', 'if-modified-since')
+            }
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        conn = http.client.HTTPConnection(TARGET_HOST, TARGET_PORT)
+        conn.request('GET', self.path, None, headers)
+        response = conn.getresponse()
+        body = response.read()
+
+        if entry is not None and response.status == 304:
+            refreshed = {name.lower(): (name, value) for name, value in entry.headers}
+            for name, value in response.getheaders():
+                if name.lower() in NOT_MODIFIED_HEADERS:
+                    refreshed[name.lower()] = (name, value)
+            entry.update(list(refreshed.values()))
+            self.send_cached(entry)
+            return
+
+        response_headers = [
+            (name, value) for name, value in response.getheaders()
+            if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != 'content-length'
+        ]
+        if response.status not in (204, 304):
+            response_headers.append(('Content-Length', str(len(body))))
+        if is_cacheable(response):
+            new_entry = CacheEntry(response.status, response_headers, body)
+            if CACHE.put(key, new_entry):
+                self.send_cached(new_entry)
+                return
+        else:
+            CACHE.discard(key)
+
+        self.send_response(response.status)
+        for name, value in response_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_cached(self, entry):
+        if self.client_has_current(entry):
+            self.send_response(304)
+            for name, value in entry.headers:
+                if name.lower() in NOT_MODIFIED_HEADERS:
+                    self.send_header(name, value)
+            self.end_headers()
+            return
+
+        self.send_response(entry.status)
+        for name, value in entry.headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(entry.body)
+
+    def client_has_current(self, entry):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return entry.etag is not None and etag_matches(if_none_match, entry.etag)
+        if_modified_since = parse_http_date(self.headers.get('If-Modified-Since'))
+        last_modified = parse_http_date(entry.last_modified)
+        return if_modified_since is not None and last_modified is not None and last_modified <= if_modified_since
+
 def run():
     server_address = ('0.0.0.0', LISTEN_PORT)
     httpd = http.server.HTTPServer(server_address, ProxyHandler)
     print(f"Proxy started on 0.0.0.0:{LISTEN_PORT} -> http://{TARGET_HOST}:{TARGET_PORT}")
+    if CACHE is not None:
+        print(f"Response cache enabled: {CACHE_MAX_BYTES} bytes total, {CACHE_ENTRY_MAX_BYTES} bytes per entry")
     httpd.serve_forever()
 
 if __name__ == "__main__":
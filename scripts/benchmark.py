@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Benchmark the metadata and prompt tooling against synthetic manifests.
+
+For each requested size a temporary repository is synthesized: an agents.json with
+that many agents (cloned from the real entries), matching agents/<id>/ directories,
+and copies of README.md and agent.sh. Every case is run once under tracemalloc to
+record its peak memory and then timed over several repeats.
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import generate_prompt
+import make
+import sync_agents
+
+
+DEFAULT_SIZES = [10, 100, 1000]
+
+
+def synthesize(root, size):
+    with sync_agents.MANIFEST_PATH.open() as f:
+        templates = json.load(f)["agents"]
+
+    agents = []
+    lock = {"agents": {}}
+    for index in range(size):
+        template = templates[index % len(templates)]
+        agent_id = f"{template['id']}-{index:05d}"
+        agent = copy.deepcopy(template)
+        agent["id"] = agent_id
+        agent["image_dir"] = f"agents/{agent_id}"
+        agents.append(agent)
+
+        source_dir = sync_agents.ROOT / template["image_dir"]
+        agent_dir = root / agent["image_dir"]
+        agent_dir.mkdir(parents=True)
+        for name in ("Dockerfile", "README.md"):
+            shutil.copyfile(source_dir / name, agent_dir / name)
+
+        lock["agents"][agent_id] = {
+            "build_args": {"BASE_IMAGE": f"ubuntu:24.04@sha256:{index:064x}"},
+            "pinned": index % 2 == 0,
+        }
+
+    (root / "agents.json").write_text(json.dumps({"agents": agents}, indent=2))
+    (root / "agents.lock.json").write_text(json.dumps(lock, indent=2))
+    shutil.copyfile(sync_agents.README_PATH, root / "README.md")
+    shutil.copyfile(sync_agents.AGENT_SH_PATH, root / "agent.sh")
+
+
+@contextlib.contextmanager
+def repository(root):
+    """Point sync_agents at a synthetic repository for the duration of the block."""
+    names = ("MANIFEST_PATH", "README_PATH", "AGENT_SH_PATH", "LOCK_PATH")
+    saved = {name: getattr(sync_agents, name) for name in names}
+    sync_agents.MANIFEST_PATH = root / "agents.json"
+    sync_agents.README_PATH = root / "README.md"
+    sync_agents.AGENT_SH_PATH = root / "agent.sh"
+    sync_agents.LOCK_PATH = root / "agents.lock.json"
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(sync_agents, name, value)
+
+
+def cases(root):
+    agents = sync_agents.load_agents()
+    manifest = {agent["id"]: agent for agent in agents}
+    lock = sync_agents.load_lock()
+    prompts_dir = root / "prompts"
+
+    def generate_prompts():
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_prompt.generate_prompts(str(root), str(prompts_dir))
+
+    return {
+        "load_agents": sync_agents.load_agents,
+        "validate_agents": lambda: sync_agents.validate_agents(agents),
+        "render_root_table": lambda: sync_agents.render_root_table(agents),
+        "render_run_case": lambda: sync_agents.render_run_case(agents, lock),
+        "render_build_case": lambda: sync_agents.render_build_case(agents, lock),
+        "render_rebuild_all_case": lambda: sync_agents.render_rebuild_all_case(agents, lock),
+        "sync_readme": lambda: sync_agents.sync_readme(agents),
+        "sync_agent_sh": lambda: sync_agents.sync_agent_sh(agents, lock),
+        "make_build_commands": lambda: [
+            make.build_command(agent["id"], root / agent["image_dir"], lock, manifest, "", "")
+            for agent in agents
+        ],
+        "generate_prompts": generate_prompts,
+    }
+
+
+def measure(func, repeat):
+    # The traced run doubles as a warm-up for the timed ones.
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min_s": min(timings),
+        "median_s": statistics.median(timings),
+        "peak_bytes": peak,
+    }
+
+
+def run(sizes, repeat, selected):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix=f"agents-bench-{size}-") as tmp:
+            root = Path(tmp)
+            synthesize(root, size)
+            with repository(root):
+                for name, func in cases(root).items():
+                    if selected and name not in selected:
+                        continue
+                    result = {"size": size, "case": name, **measure(func, repeat)}
+                    results.append(result)
+                    print(
+                        f"  {size:>6} {name:<24} median {result['median_s'] * 1000:10.2f} ms"
+                        f"  peak {result['peak_bytes'] / 1024:10.1f} KiB"
+                    )
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = {(r["size"], r["case"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\nComparison with {baseline_path} (threshold {threshold:.2f}x):")
+    for result in results:
+        previous = baseline.get((result["size"], result["case"]))
+        if previous is None:
+            continue
+        # The fastest run is the least noisy basis for comparing small timings.
+        time_ratio = result["min_s"] / previous["min_s"] if previous["min_s"] else 1.0
+        memory_ratio = result["peak_bytes"] / previous["peak_bytes"] if previous["peak_bytes"] else 1.0
+        flag = ""
+        if time_ratio > threshold or memory_ratio > threshold:
+            flag = "  \033[1;31mREGRESSION\033[0m"
+            regressions.append(result)
+        print(
+            f"  {result['size']:>6} {result['case']:<24} time {time_ratio:5.2f}x"
+            f"  memory {memory_ratio:5.2f}x{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark sync_agents.py, generate_prompt.py and make.py at scale."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Manifest sizes to synthesize (default: 10 100 1000)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: 5)")
+    parser.add_argument("--case", action="append", help="Only run the named case (repeatable)")
+    parser.add_argument(
+        "--output",
+        default="benchmark-results.json",
+        help="Where to write results (default: benchmark-results.json)",
+    )
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Ratio over the baseline that counts as a regression (default: 1.25)",
+    )
+    args = parser.parse_args()
+
+    print(f"Benchmarking sizes {', '.join(map(str, args.sizes))} ({args.repeat} repeats)...")
+    results = run(args.sizes, args.repeat, set(args.case or []))
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\033[1;32m[DONE]\033[0m Results written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
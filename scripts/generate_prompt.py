@@ -358,17 +358,7 @@ Document required environment variables (set at runtime, not in Dockerfile).
 - **Fast rebuilds**: Use base image (`Dockerfile.code_agent`) to cache project dependencies — rebuild base only when deps change
 """
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate prompts for coding agent Dockerfiles.")
-    parser.add_argument(
-        "--dir",
-        default="code_agent_docker_prompts",
-        help="Output directory for generated prompts (default: code_agent_docker_prompts)",
-    )
-    args = parser.parse_args()
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(script_dir)
+def generate_prompts(root_dir, out_dir, only=None):
     manifest_path = os.path.join(root_dir, "agents.json")
     try:
         with open(manifest_path, "r") as f:
@@ -417,7 +407,14 @@ def main():
         print("Please add the missing entries to agents.json.")
         sys.exit(1)
 
-    os.makedirs(args.dir, exist_ok=True)
+    if only:
+        unknown_agents = [agent for agent in only if agent not in agents]
+        if unknown_agents:
+            print("Error: Unknown agent(s): " + ", ".join(sorted(unknown_agents)))
+            sys.exit(1)
+        agents = [agent for agent in agents if agent in only]
+
+    os.makedirs(out_dir, exist_ok=True)
 
     # Check for existing base image
     project_name = os.path.basename(root_dir)
@@ -462,12 +459,31 @@ def main():
             PROJECT_NAME=project_name,
         )
 
-        out_path = os.path.join(args.dir, f"{selected_agent}.md")
+        out_path = os.path.join(out_dir, f"{selected_agent}.md")
         with open(out_path, "w") as f:
             f.write(final_prompt)
         print(f"Generated: {out_path}")
 
-    print(f"\nAll prompts saved to: {args.dir}")
+    print(f"\nAll prompts saved to: {out_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate prompts for coding agent Dockerfiles.")
+    parser.add_argument(
+        "--dir",
+        default="code_agent_docker_prompts",
+        help="Output directory for generated prompts (default: code_agent_docker_prompts)",
+    )
+    parser.add_argument(
+        "--agent",
+        action="append",
+        help="Only generate the prompt for this agent (repeatable; default: all agents)",
+    )
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.dirname(script_dir)
+    generate_prompts(root_dir, args.dir, args.agent)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Export agent images to (and import them from) a deduplicated, zstd-compressed archive.
+
+Every regular file of a `docker save` archive is stored once, content-addressed by
+its sha256, under `blobs/sha256/<hex>.zst`. Image layers shared between agents
+(base images, common apt layers) are therefore written and transferred only once.
+`manifest.json` records how to reassemble each agent's `docker save` tarball and
+`SHA256SUMS` lets the compressed blobs be checked with `sha256sum -c` after copying.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from sync_agents import load_agents
+
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+CHECKSUMS_NAME = "SHA256SUMS"
+FORMAT_VERSION = 1
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_hint(path):
+    """Return the digest encoded in an OCI `blobs/sha256/<hex>` path, if any."""
+    parts = path.split("/")
+    if len(parts) == 3 and parts[:2] == ["blobs", "sha256"] and len(parts[2]) == 64:
+        return parts[2]
+    return None
+
+
+class BlobStore:
+    def __init__(self, root, blobs, level, threads):
+        self.root = root
+        self.blobs = blobs
+        self.level = level
+        self.threads = threads
+        self.lock = threading.Lock()
+        (root / "blobs" / "sha256").mkdir(parents=True, exist_ok=True)
+
+    def path(self, digest):
+        return self.root / "blobs" / "sha256" / f"{digest}.zst"
+
+    def has(self, digest):
+        with self.lock:
+            return digest in self.blobs
+
+    def add(self, fileobj, hint=None):
+        if hint and self.has(hint):
+            # Already stored by another agent; tarfile skips the unread data.
+            return hint, False
+
+        tmp = self.root / "blobs" / f".tmp-{threading.get_ident()}-{os.getpid()}.zst"
+        compressor = subprocess.Popen(
+            ["zstd", "-q", "-f", f"-{self.level}", f"-T{self.threads}", "-o", str(tmp)],
+            stdin=subprocess.PIPE,
+        )
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+                compressor.stdin.write(chunk)
+        finally:
+            compressor.stdin.close()
+            returncode = compressor.wait()
+        if returncode != 0:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"zstd exited with status {returncode}")
+
+        hexdigest = digest.hexdigest()
+        if hint and hint != hexdigest:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"Digest mismatch for blob {hint}: got {hexdigest}")
+
+        # Hash the compressed file before taking the lock so other exports are not blocked.
+        info = {
+            "size": size,
+            "compressed_size": tmp.stat().st_size,
+            "compressed_sha256": sha256_file(tmp),
+        }
+        with self.lock:
+            if hexdigest in self.blobs:
+                tmp.unlink()
+                return hexdigest, False
+            tmp.replace(self.path(hexdigest))
+            self.blobs[hexdigest] = info
+        return hexdigest, True
+
+
+class VerifyingReader:
+    """Streams a zstd blob back out while hashing the decompressed bytes."""
+
+    def __init__(self, path):
+        self.process = subprocess.Popen(["zstd", "-q", "-d", "-c", str(path)], stdout=subprocess.PIPE)
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.process.stdout.read(size)
+        self.digest.update(data)
+        return data
+
+    def verify(self, digest):
+        # Any output beyond the recorded size means the blob does not match the manifest.
+        trailing = self.process.stdout.read(1)
+        self.process.stdout.close()
+        returncode = self.process.wait()
+        return returncode == 0 and not trailing and self.digest.hexdigest() == digest
+
+
+def export_image(agent_id, store):
+    image = f"{agent_id}:latest"
+    entries = []
+    written = 0
+    save = subprocess.Popen(["docker", "save", image], stdout=subprocess.PIPE)
+    tar_error = None
+    try:
+        with tarfile.open(fileobj=save.stdout, mode="r|") as tar:
+            for member in tar:
+                entry = {"path": member.name, "mode": member.mode}
+                if member.isdir():
+                    entry["type"] = "dir"
+                elif member.issym():
+                    entry.update(type="symlink", target=member.linkname)
+                elif member.islnk():
+                    entry.update(type="link", target=member.linkname)
+                elif member.isfile():
+                    digest, new = store.add(tar.extractfile(member), blob_hint(member.name))
+                    entry.update(type="file", digest=digest)
+                    written += member.size if new else 0
+                else:
+                    raise RuntimeError(f"Unsupported tar member type in {image}: {member.name}")
+                entries.append(entry)
+    except tarfile.TarError as exc:
+        # A failed `docker save` (e.g. a missing image) shows up as an empty or truncated tar
+        # stream; report the docker failure rather than the tar one.
+        tar_error = exc
+    finally:
+        save.stdout.close()
+        returncode = save.wait()
+    if returncode != 0:
+        raise RuntimeError(f"docker save {image} exited with status {returncode}") from tar_error
+    if tar_error is not None:
+        raise tar_error
+    return {"image": image, "entries": entries}, written
+
+
+def import_image(agent_id, record, root, blobs):
+    load = subprocess.Popen(["docker", "load"], stdin=subprocess.PIPE)
+    try:
+        with tarfile.open(fileobj=load.stdin, mode="w|") as tar:
+            for entry in record["entries"]:
+                info = tarfile.TarInfo(entry["path"])
+                info.mode = entry["mode"]
+                if entry["type"] == "dir":
+                    info.type = tarfile.DIRTYPE
+                    tar.addfile(info)
+                elif entry["type"] in ("symlink", "link"):
+                    info.type = tarfile.SYMTYPE if entry["type"] == "symlink" else tarfile.LNKTYPE
+                    info.linkname = entry["target"]
+                    tar.addfile(info)
+                else:
+                    digest = entry["digest"]
+                    info.size = blobs[digest]["size"]
+                    reader = VerifyingReader(root / "blobs" / "sha256" / f"{digest}.zst")
+                    try:
+                        tar.addfile(info, reader)
+                    finally:
+                        valid = reader.verify(digest)
+                    if not valid:
+                        raise RuntimeError(f"Blob {digest} is corrupt (referenced by {entry['path']})")
+    except BaseException:
+        load.kill()
+        load.wait()
+        raise
+    load.stdin.close()
+    returncode = load.wait()
+    if returncode != 0:
+        raise RuntimeError(f"docker load exited with status {returncode}")
+
+
+def load_manifest(root):
+    path = root / MANIFEST_NAME
+    if not path.exists():
+        return None
+    with path.open() as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported archive format in {path}: {manifest.get('format')}")
+    return manifest
+
+
+def write_manifest(root, manifest):
+    (root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    lines = [
+        f"{blob['compressed_sha256']}  blobs/sha256/{digest}.zst"
+        for digest, blob in sorted(manifest["blobs"].items())
+    ]
+    (root / CHECKSUMS_NAME).write_text("\n".join(lines) + "\n")
+
+
+def run_parallel(label, agent_ids, jobs, task):
+    """Run `task(agent_id)` for each agent on a thread pool; return failed ids."""
+    failed = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(task, agent_id): agent_id for agent_id in agent_ids}
+        for future in as_completed(futures):
+            agent_id = futures[future]
+            try:
+                message = future.result()
+            except Exception as exc:
+                print(f"  \033[1;31m{agent_id} failed: {exc}\033[0m")
+                failed.append(agent_id)
+            else:
+                print(f"  {label} {agent_id}: {message}")
+    return failed
+
+
+def export_images(args):
+    known = [agent["id"] for agent in load_agents()]
+    agent_ids = args.agents or known
+    unknown = [agent_id for agent_id in agent_ids if agent_id not in known]
+    if unknown:
+        print("Error: Unknown agent(s): " + ", ".join(unknown))
+        sys.exit(1)
+
+    root = Path(args.output)
+    root.mkdir(parents=True, exist_ok=True)
+    # Re-exporting into an existing archive reuses blobs that are already on disk.
+    manifest = load_manifest(root) or {"format": FORMAT_VERSION, "agents": {}, "blobs": {}}
+    manifest["blobs"] = {
+        digest: blob for digest, blob in manifest["blobs"].items()
+        if (root / "blobs" / "sha256" / f"{digest}.zst").exists()
+    }
+    jobs = max(1, min(args.jobs, len(agent_ids)))
+    store = BlobStore(root, manifest["blobs"], args.level, max(1, (os.cpu_count() or 1) // jobs))
+
+    def task(agent_id):
+        record, written = export_image(agent_id, store)
+        manifest["agents"][agent_id] = record
+        return f"{written / 1024 / 1024:.1f} MiB of new content"
+
+    print(f"Exporting {len(agent_ids)} image(s) to {root} with {jobs} job(s)...")
+    failed = run_parallel("exported", agent_ids, jobs, task)
+
+    # Drop blobs no longer referenced by any agent (e.g. after re-exporting an updated image).
+    referenced = {
+        entry["digest"]
+        for record in manifest["agents"].values()
+        for entry in record["entries"] if entry["type"] == "file"
+    }
+    for digest in set(manifest["blobs"]) - referenced:
+        store.path(digest).unlink(missing_ok=True)
+        del manifest["blobs"][digest]
+    write_manifest(root, manifest)
+
+    total = sum(blob["compressed_size"] for blob in manifest["blobs"].values())
+    print(f"\033[1;32m[DONE]\033[0m {len(manifest['blobs'])} unique blobs, {total / 1024 / 1024:.1f} MiB compressed")
+    if failed:
+        print(f"  \033[1;31mFailed ({len(failed)}): {', '.join(failed)}\033[0m")
+        sys.exit(1)
+
+
+def import_images(args):
+    root = Path(args.input)
+    manifest = load_manifest(root)
+    if manifest is None:
+        print(f"Error: {root / MANIFEST_NAME} not found.")
+        sys.exit(1)
+
+    agent_ids = args.agents or sorted(manifest["agents"])
+    unknown = [agent_id for agent_id in agent_ids if agent_id not in manifest["agents"]]
+    if unknown:
+        print("Error: Agent(s) not in archive: " + ", ".join(unknown))
+        sys.exit(1)
+
+    jobs = max(1, min(args.jobs, len(agent_ids)))
+
+    def task(agent_id):
+        record = manifest["agents"][agent_id]
+        import_image(agent_id, record, root, manifest["blobs"])
+        return f"loaded {record['image']}"
+
+    print(f"Importing {len(agent_ids)} image(s) from {root} with {jobs} job(s)...")
+    failed = run_parallel("imported", agent_ids, jobs, task)
+    print(f"\033[1;32m[DONE]\033[0m Imported {len(agent_ids) - len(failed)} image(s).")
+    if failed:
+        print(f"  \033[1;31mFailed ({len(failed)}): {', '.join(failed)}\033[0m")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import agent images for offline hosts.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write agent images to a compressed archive")
+    export_parser.add_argument("agents", nargs="*", help="Agent ids to export (default: all)")
+    export_parser.add_argument(
+        "--output",
+        default="agent-images",
+        help="Archive directory (default: agent-images)",
+    )
+    export_parser.add_argument("--jobs", type=int, default=4, help="Images to export concurrently (default: 4)")
+    export_parser.add_argument("--level", type=int, default=10, help="zstd compression level (default: 10)")
+
+    import_parser = subparsers.add_parser("import", help="Load agent images from an archive")
+    import_parser.add_argument("input", help="Archive directory written by export")
+    import_parser.add_argument("agents", nargs="*", help="Agent ids to import (default: all in archive)")
+    import_parser.add_argument("--jobs", type=int, default=4, help="Images to load concurrently (default: 4)")
+
+    args = parser.parse_args()
+
+    if shutil.which("zstd") is None:
+        print("Error: the 'zstd' command is required but was not found in PATH.")
+        sys.exit(1)
+
+    if args.command == "export":
+        export_images(args)
+    else:
+        import_images(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from sync_agents import (
+    LOCK_PATH,
+    ROOT,
+    load_agents,
+    load_lock,
+    sync_agent_sh,
+    validate_agents,
+)
+
+
+# Registry endpoints can be redirected (e.g. to a local stub registry) via the environment.
+NPM_REGISTRY = os.environ.get("AGENTS_LOCK_NPM_REGISTRY", "https://registry.npmjs.org")
+PYPI_INDEX = os.environ.get("AGENTS_LOCK_PYPI_INDEX", "https://pypi.org/pypi")
+IMAGE_REGISTRY = os.environ.get("AGENTS_LOCK_IMAGE_REGISTRY", "")
+
+DOCKER_HUB = "registry-1.docker.io"
+MANIFEST_ACCEPT = ", ".join([
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+])
+IMAGE_ARG = re.compile(r"^ARG ([A-Z][A-Z0-9_]*_IMAGE)=(\S+)\s*$", re.MULTILINE)
+
+
+def parse_image_ref(ref):
+    """Split an image reference into (registry, repository, tag)."""
+    name = ref.partition("@")[0]
+    tag = "latest"
+    if ":" in name.rsplit("/", 1)[-1]:
+        name, tag = name.rsplit(":", 1)
+    first, _, rest = name.partition("/")
+    if rest and ("." in first or ":" in first or first == "localhost"):
+        return first, rest, tag
+    if "/" not in name:
+        name = f"library/{name}"
+    return DOCKER_HUB, name, tag
+
+
+def image_args(dockerfile):
+    """Return the `ARG *_IMAGE=<ref>` defaults declared in a Dockerfile."""
+    return dict(IMAGE_ARG.findall(dockerfile.read_text()))
+
+
+class Resolver:
+    """Resolves CLI versions and image digests.
+
+    Version sources are dispatched to `resolve_<resolver>` methods, so a new
+    package ecosystem only needs a method here (or on a subclass).
+    """
+
+    def __init__(self, npm_registry=NPM_REGISTRY, pypi_index=PYPI_INDEX,
+                 image_registry=IMAGE_REGISTRY, timeout=30):
+        self.npm_registry = npm_registry.rstrip("/")
+        self.pypi_index = pypi_index.rstrip("/")
+        self.image_registry = image_registry.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, url, method="GET", headers=None):
+        request = urllib.request.Request(url, method=method, headers=headers or {})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _get_json(self, url):
+        with self._open(url, headers={"Accept": "application/json"}) as response:
+            return json.load(response)
+
+    def cli_version(self, source):
+        resolve = getattr(self, f"resolve_{source['resolver']}", None)
+        if resolve is None:
+            raise ValueError(f"Unknown version resolver '{source['resolver']}'")
+        return resolve(source["package"])
+
+    def resolve_npm(self, package):
+        quoted = urllib.parse.quote(package, safe="@/")
+        return self._get_json(f"{self.npm_registry}/{quoted}/latest")["version"]
+
+    def resolve_pypi(self, package):
+        quoted = urllib.parse.quote(package, safe="")
+        return self._get_json(f"{self.pypi_index}/{quoted}/json")["info"]["version"]
+
+    def _token(self, challenge):
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = params.pop("realm", None)
+        if realm is None:
+            raise ValueError(f"Unsupported registry auth challenge: {challenge}")
+        data = self._get_json(f"{realm}?{urllib.parse.urlencode(params)}")
+        return data.get("token") or data["access_token"]
+
+    def _manifest(self, url, method):
+        headers = {"Accept": MANIFEST_ACCEPT}
+        try:
+            return self._open(url, method, headers)
+        except urllib.error.HTTPError as exc:
+            challenge = exc.headers.get("WWW-Authenticate", "")
+            if exc.code != 401 or not challenge.lower().startswith("bearer "):
+                raise
+            headers["Authorization"] = f"Bearer {self._token(challenge)}"
+            return self._open(url, method, headers)
+
+    def image_digest(self, ref):
+        registry, repository, tag = parse_image_ref(ref)
+        base = self.image_registry or f"https://{registry}"
+        url = f"{base}/v2/{repository}/manifests/{tag}"
+        with self._manifest(url, "HEAD") as response:
+            digest = response.headers.get("Docker-Content-Digest")
+        if digest:
+            return digest
+        # Not every registry reports the digest on HEAD; hash the manifest instead.
+        with self._manifest(url, "GET") as response:
+            return "sha256:" + hashlib.sha256(response.read()).hexdigest()
+
+    def pin_image(self, ref):
+        if "@" in ref:
+            return ref
+        return f"{ref}@{self.image_digest(ref)}"
+
+
+def lock_agent(agent, resolver):
+    build_args = {}
+    for name, ref in image_args(ROOT / agent["image_dir"] / "Dockerfile").items():
+        build_args[name] = resolver.pin_image(ref)
+
+    version_source = agent.get("version_source")
+    if version_source is not None:
+        build_args[version_source["build_arg"]] = resolver.cli_version(version_source)
+
+    return {"build_args": build_args, "pinned": version_source is not None}
+
+
+def describe_changes(agent_id, old, new):
+    old_args = old["build_args"] if old else {}
+    changes = []
+    for name, value in sorted(new["build_args"].items()):
+        if old_args.get(name) != value:
+            changes.append(f"{name} {old_args.get(name, '(unset)')} -> {value}")
+    if not changes:
+        return f"  {agent_id}: up to date"
+    return f"  {agent_id}: " + "; ".join(changes)
+
+
+def write_lock(lock):
+    LOCK_PATH.write_text(json.dumps(lock, indent=2, sort_keys=True) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Resolve agent CLI versions and base image digests into agents.lock.json."
+    )
+    parser.add_argument(
+        "agents",
+        nargs="*",
+        help="Agent ids to re-resolve (default: all agents in agents.json)",
+    )
+    args = parser.parse_args()
+
+    agents = load_agents()
+    validate_agents(agents)
+    agent_map = {agent["id"]: agent for agent in agents}
+
+    unknown = [agent_id for agent_id in args.agents if agent_id not in agent_map]
+    if unknown:
+        print("Error: Unknown agent(s): " + ", ".join(unknown))
+        sys.exit(1)
+
+    lock = load_lock()
+    if args.agents:
+        selected = args.agents
+    else:
+        selected = list(agent_map)
+        # Drop entries for agents that were removed from the manifest.
+        lock["agents"] = {k: v for k, v in lock["agents"].items() if k in agent_map}
+
+    resolver = Resolver()
+    failed = []
+    print(f"Resolving {len(selected)} agent(s)...")
+    for agent_id in selected:
+        try:
+            entry = lock_agent(agent_map[agent_id], resolver)
+        except (OSError, ValueError, KeyError) as exc:
+            print(f"  \033[1;31m{agent_id}: {exc}\033[0m")
+            failed.append(agent_id)
+            continue
+        print(describe_changes(agent_id, lock["agents"].get(agent_id), entry))
+        lock["agents"][agent_id] = entry
+
+    write_lock(lock)
+    sync_agent_sh(agents, lock)
+    print(f"Wrote {LOCK_PATH.name} and refreshed build commands in agent.sh")
+    if failed:
+        print(f"\033[1;31mFailed to resolve: {', '.join(failed)}\033[0m")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
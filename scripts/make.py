@@ -4,6 +4,15 @@ import subprocess
 import sys
 from pathlib import Path
 
+from sync_agents import (
+    build_flags,
+    image_labels,
+    image_version,
+    load_agents,
+    load_lock,
+    locked_build_args,
+)
+
 
 ROOT = Path(__file__).resolve().parent.parent
 AGENT_SH = ROOT / "agent.sh"
@@ -15,6 +24,37 @@ def execute(cmd, **kwargs):
     return subprocess.run(cmd, shell=True, **kwargs)
 
 
+def vcs_revision():
+    """Return (commit hash, commit time) of HEAD, or empty strings outside a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(ROOT), "show", "-s", "--format=%H%n%cI", "HEAD"],
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return "", ""
+    if result.returncode != 0:
+        return "", ""
+    revision, created = result.stdout.split()
+    return revision, created
+
+
+def build_command(name, agent_dir, lock, manifest, revision, created):
+    agent = manifest.get(name, {"id": name})
+    labels = image_labels(
+        agent_dir, locked_build_args(name, lock), image_version(agent, lock), created, revision
+    )
+    parts = ["docker build"]
+    parts.extend(shlex.quote(flag) for flag in build_flags(name, lock) + labels)
+    parts.append(f"-t {name}:latest {agent_dir}")
+    return " ".join(parts)
+
+
+def load_manifest():
+    return {agent["id"]: agent for agent in load_agents()}
+
+
 def build_agent(name):
     agent_dir = AGENTS_DIR / name
     if not agent_dir.is_dir():
@@ -23,7 +63,7 @@ def build_agent(name):
     if not (agent_dir / "Dockerfile").exists():
         print(f"Dockerfile not found in {agent_dir}/")
         sys.exit(1)
-    result = execute(f"docker build --no-cache -t {name}:latest {agent_dir}")
+    result = execute(build_command(name, agent_dir, load_lock(), load_manifest(), *vcs_revision()))
     sys.exit(result.returncode)
 
 
@@ -36,12 +76,15 @@ def build_all():
         print("No agents found.")
         sys.exit(1)
 
+    lock = load_lock()
+    manifest = load_manifest()
+    revision, created = vcs_revision()
     failed = []
     succeeded = []
     for i, agent_dir in enumerate(agents, 1):
         name = agent_dir.name
         print(f"\n[{i}/{len(agents)}] {name}")
-        result = execute(f"docker build --no-cache -t {name}:latest {agent_dir}")
+        result = execute(build_command(name, agent_dir, lock, manifest, revision, created))
         if result.returncode == 0:
             succeeded.append(name)
         else:
@@ -65,8 +108,8 @@ def sync_metadata():
     sys.exit(result.returncode)
 
 
-def generate_prompt(extra_args):
-    cmd = f"python3 {ROOT / 'scripts' / 'generate_prompt.py'}"
+def run_script(name, extra_args):
+    cmd = f"python3 {ROOT / 'scripts' / name}"
     if extra_args:
         cmd += " " + " ".join(shlex.quote(arg) for arg in extra_args)
     result = execute(cmd)
@@ -85,8 +128,14 @@ def usage():
     print("  build-all          Build all agent Docker images")
     print("  build <agent>      Build a single agent Docker image")
     print("  run                Select and run an agent container")
+    print("  run-matrix <agents...> --task FILE [--jobs N]  Run one task across several agents")
     print("  sync-metadata      Sync agent.sh and README.md from agents.json")
+    print("  watch [args]       Re-sync, rebuild and regenerate prompts when agent files change")
+    print("  lock [agents...]   Pin CLI versions and base image digests in agents.lock.json")
+    print("  export [agents...] [--output DIR]  Save images as a compressed, deduplicated archive")
+    print("  import DIR [agents...]  Load images from an archive written by export")
     print("  generate-prompt [args]  Generate project-specific Dockerfile prompts")
+    print("  benchmark [args]   Benchmark the metadata and prompt tooling on synthetic manifests")
     print("  clean              Remove dangling Docker images")
     sys.exit(1)
 
@@ -106,10 +155,20 @@ def main():
         build_agent(sys.argv[2])
     elif cmd == "run":
         run_agent()
+    elif cmd == "run-matrix":
+        run_script("run_matrix.py", sys.argv[2:])
     elif cmd == "sync-metadata":
         sync_metadata()
+    elif cmd == "watch":
+        run_script("watch_agents.py", sys.argv[2:])
+    elif cmd == "lock":
+        run_script("lock_agents.py", sys.argv[2:])
+    elif cmd in ("export", "import"):
+        run_script("image_archive.py", sys.argv[1:])
     elif cmd == "generate-prompt":
-        generate_prompt(sys.argv[2:])
+        run_script("generate_prompt.py", sys.argv[2:])
+    elif cmd == "benchmark":
+        run_script("benchmark.py", sys.argv[2:])
     elif cmd == "clean":
         clean()
     else:
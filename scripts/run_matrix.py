@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Run one non-interactive task across several agents and collect a JSON report.
+
+Each agent gets its own copy of the project, mounted at /app, and is started with
+the mounts, env vars and docker args from agents.json. Instead of `command_args`,
+the agent's `run.headless_args` are used, with `{prompt}` replaced by the task text.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sync_agents import load_agents, resource_args, validate_agents
+
+
+MEMORY_UNITS = {
+    "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3,
+}
+
+
+def parse_memory(value):
+    """Parse a `docker stats` MemUsage value such as '123.4MiB / 7.6GiB' into bytes."""
+    match = re.match(r"\s*([\d.]+)\s*([a-zA-Z]+)", value)
+    if not match:
+        return None
+    unit = MEMORY_UNITS.get(match.group(2).lower())
+    if unit is None:
+        return None
+    return int(float(match.group(1)) * unit)
+
+
+def docker_run_argv(agent, project_dir, prompt, container_name):
+    run = agent["run"]
+    argv = ["docker", "run", "--rm", "--name", container_name, "-v", f"{project_dir}:/app"]
+    for mount in run["mounts"]:
+        host = os.path.expandvars(mount["host"])
+        argv.extend(["-v", f"{host}:{mount['container']}"])
+    for env_var in run["env_vars"]:
+        # Pass by name so secrets never appear in the argv or the report.
+        if env_var in os.environ:
+            argv.extend(["-e", env_var])
+    argv.extend(resource_args(run.get("resources", {}), os.environ))
+    argv.extend(run["docker_args"])
+    argv.append(f"{agent['id']}:latest")
+    argv.extend(prompt if arg == "{prompt}" else arg for arg in run["headless_args"])
+    return argv
+
+
+class MemorySampler(threading.Thread):
+    """Polls `docker stats` for a container and keeps the highest usage seen."""
+
+    def __init__(self, container_name, interval):
+        super().__init__(daemon=True)
+        self.container_name = container_name
+        self.interval = interval
+        self.peak = None
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            result = subprocess.run(
+                ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}", self.container_name],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                continue
+            usage = parse_memory(result.stdout)
+            if usage is not None and (self.peak is None or usage > self.peak):
+                self.peak = usage
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_agent(agent, args, prompt, work_dir):
+    agent_id = agent["id"]
+    agent_dir = work_dir / agent_id
+    if agent_dir.exists():
+        shutil.rmtree(agent_dir)
+    project_copy = agent_dir / "project"
+    # The work dir may live inside the project (the default when run from its root).
+    shutil.copytree(
+        args.project,
+        project_copy,
+        symlinks=True,
+        ignore=lambda src, names: [n for n in names if os.path.join(src, n) == str(work_dir)],
+    )
+    log_path = agent_dir / "output.log"
+
+    container_name = f"run-matrix-{agent_id}-{os.getpid()}"
+    argv = docker_run_argv(agent, project_copy.resolve(), prompt, container_name)
+    sampler = MemorySampler(container_name, args.sample_interval)
+
+    timed_out = False
+    start = time.monotonic()
+    with log_path.open("wb") as log:
+        process = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        sampler.start()
+        try:
+            exit_code = process.wait(timeout=args.timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            subprocess.run(["docker", "kill", container_name], capture_output=True)
+            exit_code = process.wait()
+        finally:
+            sampler.stop()
+    wall_time = time.monotonic() - start
+
+    return {
+        "agent": agent_id,
+        "exit_code": exit_code,
+        "timed_out": timed_out,
+        "wall_time_s": round(wall_time, 3),
+        "peak_memory_bytes": sampler.peak,
+        "log": str(log_path),
+        "project_copy": str(project_copy),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the same task across several agents in parallel.")
+    parser.add_argument("agents", nargs="+", help="Agent ids from agents.json")
+    parser.add_argument("--task", required=True, help="File containing the prompt to give every agent")
+    parser.add_argument("--project", default=".", help="Project directory to copy for each agent (default: .)")
+    parser.add_argument("--jobs", type=int, default=2, help="Agents to run concurrently (default: 2)")
+    parser.add_argument(
+        "--work-dir",
+        default="run-matrix",
+        help="Directory for per-agent project copies and logs (default: run-matrix)",
+    )
+    parser.add_argument("--output", help="Report path (default: <work-dir>/report.json)")
+    parser.add_argument("--timeout", type=float, help="Per-agent timeout in seconds")
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=1.0,
+        help="Seconds between memory samples (default: 1.0)",
+    )
+    args = parser.parse_args()
+    args.agents = list(dict.fromkeys(args.agents))
+
+    agents = load_agents()
+    validate_agents(agents)
+    agent_map = {agent["id"]: agent for agent in agents}
+
+    unknown = [agent_id for agent_id in args.agents if agent_id not in agent_map]
+    if unknown:
+        print("Error: Unknown agent(s): " + ", ".join(unknown))
+        sys.exit(1)
+    unsupported = [
+        agent_id for agent_id in args.agents
+        if agent_map[agent_id]["run"].get("headless_args") is None
+    ]
+    if unsupported:
+        print("Error: No run.headless_args in agents.json for: " + ", ".join(unsupported))
+        sys.exit(1)
+
+    project = Path(args.project).resolve()
+    if not project.is_dir():
+        print(f"Error: Project directory '{args.project}' not found.")
+        sys.exit(1)
+    args.project = project
+    prompt = Path(args.task).read_text().strip()
+
+    work_dir = Path(args.work_dir).resolve()
+    if work_dir == project:
+        print("Error: --work-dir must not be the project directory itself.")
+        sys.exit(1)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    output = Path(args.output) if args.output else work_dir / "report.json"
+
+    jobs = max(1, min(args.jobs, len(args.agents)))
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    print(f"Running {len(args.agents)} agent(s) with {jobs} job(s)...")
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(run_agent, agent_map[agent_id], args, prompt, work_dir): agent_id
+            for agent_id in args.agents
+        }
+        for future in as_completed(futures):
+            agent_id = futures[future]
+            try:
+                result = future.result()
+            except Exception as exc:
+                result = {"agent": agent_id, "error": str(exc)}
+                print(f"  \033[1;31m{agent_id}: {exc}\033[0m")
+            else:
+                status = "timed out" if result["timed_out"] else f"exit {result['exit_code']}"
+                print(f"  {agent_id}: {status} in {result['wall_time_s']:.1f}s")
+            results[agent_id] = result
+
+    report = {
+        "task": str(Path(args.task).resolve()),
+        "project": str(project),
+        "jobs": jobs,
+        "started_at": started_at,
+        "results": [results[agent_id] for agent_id in args.agents],
+    }
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\033[1;32m[DONE]\033[0m Report written to {output}")
+
+    if any(result.get("exit_code") != 0 for result in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
+import hashlib
 import json
+import os
 import re
 import shlex
 from pathlib import Path
@@ -9,6 +11,21 @@ ROOT = Path(__file__).resolve().parent.parent
 MANIFEST_PATH = ROOT / "agents.json"
 README_PATH = ROOT / "README.md"
 AGENT_SH_PATH = ROOT / "agent.sh"
+LOCK_PATH = ROOT / "agents.lock.json"
+
+# Image label holding context_hash(); checked by agent.sh before launching an agent.
+CONTEXT_LABEL = "io.github.rntk.code-agents-docker.context"
+
+# resources key -> (docker run flag, environment variable that overrides it for every agent)
+RESOURCE_FLAGS = {
+    "cpus": ("--cpus", "AGENT_CPUS"),
+    "memory": ("--memory", "AGENT_MEMORY"),
+    "shm_size": ("--shm-size", "AGENT_SHM_SIZE"),
+}
+# Only applied to agents that declare node_heap_mb, i.e. Node-based CLIs.
+NODE_HEAP_ENV = "AGENT_NODE_HEAP_MB"
+RESOURCE_KEYS = {*RESOURCE_FLAGS, "tmpfs", "ulimits", "node_heap_mb"}
+TMPFS_KEYS = {"path", "size", "exec"}
 
 
 def load_agents():
@@ -17,6 +34,85 @@ def load_agents():
     return data["agents"]
 
 
+def load_lock():
+    if not LOCK_PATH.exists():
+        return {"agents": {}}
+    with LOCK_PATH.open() as f:
+        return json.load(f)
+
+
+def build_flags(agent_id, lock):
+    # Only fully pinned agents may reuse the layer cache; anything that still
+    # installs "latest" has to be rebuilt from scratch to pick up new releases.
+    entry = lock["agents"].get(agent_id)
+    flags = [] if entry and entry["pinned"] else ["--no-cache"]
+    if entry:
+        for name, value in sorted(entry["build_args"].items()):
+            flags.extend(["--build-arg", f"{name}={value}"])
+    return flags
+
+
+def locked_build_args(agent_id, lock):
+    entry = lock["agents"].get(agent_id)
+    if not entry:
+        return ""
+    return " ".join(f"{name}={value}" for name, value in sorted(entry["build_args"].items()))
+
+
+def image_version(agent, lock):
+    entry = lock["agents"].get(agent["id"])
+    version_source = agent.get("version_source")
+    if entry and version_source:
+        return entry["build_args"].get(version_source["build_arg"], "latest")
+    return "latest"
+
+
+def is_build_input(relative_path):
+    """Whether a file under agents/<id>/ can affect the built image (docs and bytecode cannot)."""
+    path = Path(relative_path)
+    return not path.name.endswith(".md") and "__pycache__" not in path.parts[:-1]
+
+
+def context_hash(agent_dir, build_args):
+    """Hash a build context and its build args.
+
+    Mirrors context_hash() in agent.sh, i.e. the sha256 of
+    `find . -type f | LC_ALL=C sort | xargs sha256sum` over the files that pass
+    is_build_input(), followed by the build args line.
+    """
+    agent_dir = Path(agent_dir)
+    files = []
+    for dirpath, _, filenames in os.walk(agent_dir):
+        for filename in filenames:
+            path = Path(dirpath) / filename
+            relative = path.relative_to(agent_dir)
+            if path.is_file() and not path.is_symlink() and is_build_input(relative):
+                files.append(("./" + relative.as_posix(), path))
+
+    digest = hashlib.sha256()
+    for name, path in sorted(files, key=lambda item: item[0].encode()):
+        file_digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        digest.update(f"{file_digest}  {name}\n".encode())
+    digest.update(f"{build_args}\n".encode())
+    return digest.hexdigest()
+
+
+def image_labels(agent_dir, build_args, version, created, revision):
+    labels = {
+        CONTEXT_LABEL: context_hash(agent_dir, build_args),
+        "org.opencontainers.image.version": version,
+    }
+    # The commit time rather than the build time, so rebuilding an unchanged tree is a no-op.
+    if created:
+        labels["org.opencontainers.image.created"] = created
+    if revision:
+        labels["org.opencontainers.image.revision"] = revision
+    flags = []
+    for name, value in labels.items():
+        flags.extend(["--label", f"{name}={value}"])
+    return flags
+
+
 def replace_section(text, start_marker, end_marker, body, file_label):
     try:
         start = text.index(start_marker) + len(start_marker)
@@ -36,6 +132,57 @@ def replace_section(text, start_marker, end_marker, body, file_label):
     return text[:start] + "\n" + body.rstrip() + "\n" + text[end:]
 
 
+def validate_resources(agent_id, resources):
+    safe_cpus = re.compile(r"^\d+(\.\d+)?$")
+    safe_size = re.compile(r"^\d+[bkmgBKMG]?$")
+    safe_path = re.compile(r"^/[A-Za-z0-9._/-]*$")
+    safe_ulimit = re.compile(r"^[a-z]+$")
+    safe_limit = re.compile(r"^-?\d+(:-?\d+)?$")
+
+    def invalid(field, value):
+        return ValueError(
+            f"Invalid resources.{field} '{value}' for agent '{agent_id}' in {MANIFEST_PATH.name}"
+        )
+
+    def check_keys(field, value, allowed):
+        unknown = set(value) - allowed
+        if unknown:
+            raise ValueError(
+                f"Unknown {field} key(s) {', '.join(sorted(unknown))} for agent '{agent_id}' "
+                f"in {MANIFEST_PATH.name}"
+            )
+
+    if not isinstance(resources, dict):
+        raise ValueError(f"Invalid resources '{resources}' for agent '{agent_id}' in {MANIFEST_PATH.name}")
+    check_keys("resources", resources, RESOURCE_KEYS)
+    if "cpus" in resources and not safe_cpus.match(str(resources["cpus"])):
+        raise invalid("cpus", resources["cpus"])
+    for key in ("memory", "shm_size"):
+        if key in resources and not safe_size.match(str(resources[key])):
+            raise invalid(key, resources[key])
+    tmpfs = resources.get("tmpfs", [])
+    if not isinstance(tmpfs, list):
+        raise invalid("tmpfs", tmpfs)
+    for mount in tmpfs:
+        if not isinstance(mount, dict) or not isinstance(mount.get("path"), str):
+            raise invalid("tmpfs", mount)
+        check_keys("resources.tmpfs", mount, TMPFS_KEYS)
+        if not safe_path.match(mount["path"]):
+            raise invalid("tmpfs.path", mount["path"])
+        if "size" in mount and not safe_size.match(str(mount["size"])):
+            raise invalid("tmpfs.size", mount["size"])
+    ulimits = resources.get("ulimits", {})
+    if not isinstance(ulimits, dict):
+        raise invalid("ulimits", ulimits)
+    for name, limit in ulimits.items():
+        if not safe_ulimit.match(name) or not safe_limit.match(str(limit)):
+            raise invalid("ulimits", f"{name}={limit}")
+    heap = resources.get("node_heap_mb")
+    # bool is a subclass of int, so `true` would otherwise pass.
+    if heap is not None and (isinstance(heap, bool) or not isinstance(heap, int) or heap <= 0):
+        raise invalid("node_heap_mb", heap)
+
+
 def validate_agents(agents):
     safe_id = re.compile(r"^[a-z0-9][a-z0-9-]*$")
     safe_image_dir = re.compile(r"^agents/[a-z0-9][a-z0-9-]*$")
@@ -58,6 +205,28 @@ def validate_agents(agents):
                     f"Invalid env var name '{env_var}' for agent '{agent_id}' in {MANIFEST_PATH.name}"
                 )
 
+        validate_resources(agent_id, agent["run"].get("resources", {}))
+
+        headless_args = agent["run"].get("headless_args")
+        if headless_args is not None and headless_args.count("{prompt}") != 1:
+            raise ValueError(
+                f"headless_args for agent '{agent_id}' must contain exactly one '{{prompt}}' "
+                f"in {MANIFEST_PATH.name}"
+            )
+
+        version_source = agent.get("version_source")
+        if version_source is not None:
+            for key in ("resolver", "package", "build_arg"):
+                if not version_source.get(key):
+                    raise ValueError(
+                        f"Missing version_source.{key} for agent '{agent_id}' in {MANIFEST_PATH.name}"
+                    )
+            if not safe_env.match(version_source["build_arg"]):
+                raise ValueError(
+                    f"Invalid build arg name '{version_source['build_arg']}' for agent '{agent_id}' "
+                    f"in {MANIFEST_PATH.name}"
+                )
+
 
 def render_root_table(agents):
     lines = [
@@ -84,16 +253,65 @@ def render_agent_count(agents):
     return f"AGENT_COUNT={len(agents)}"
 
 
-def render_run_case(agents):
+def tmpfs_spec(mount):
+    options = ["rw"]
+    if mount.get("exec"):
+        options.append("exec")
+    if "size" in mount:
+        options.append(f"size={mount['size']}")
+    return f"{mount['path']}:{','.join(options)}"
+
+
+def resource_args(resources, environ):
+    """Return docker run arguments for a resources block, applying environment overrides."""
+    args = []
+    for key, (flag, env_name) in RESOURCE_FLAGS.items():
+        value = environ.get(env_name) or resources.get(key)
+        if value:
+            args.extend([flag, str(value)])
+    for mount in resources.get("tmpfs", []):
+        args.extend(["--tmpfs", tmpfs_spec(mount)])
+    for name, limit in sorted(resources.get("ulimits", {}).items()):
+        args.extend(["--ulimit", f"{name}={limit}"])
+    if "node_heap_mb" in resources:
+        heap = environ.get(NODE_HEAP_ENV) or resources["node_heap_mb"]
+        args.extend(["-e", f"NODE_OPTIONS=--max-old-space-size={heap}"])
+    return args
+
+
+def render_resource_flags(resources):
+    """Shell equivalent of resource_args(); overrides are resolved by bash at launch time."""
+    parts = []
+    for key, (flag, env_name) in RESOURCE_FLAGS.items():
+        if key in resources:
+            parts.append(f'{flag} "${{{env_name}:-{resources[key]}}}"')
+        else:
+            parts.append(f'${{{env_name}:+{flag} "${env_name}"}}')
+    for mount in resources.get("tmpfs", []):
+        parts.append(f"--tmpfs {shlex.quote(tmpfs_spec(mount))}")
+    for name, limit in sorted(resources.get("ulimits", {}).items()):
+        parts.append(f"--ulimit {name}={limit}")
+    if "node_heap_mb" in resources:
+        heap = resources["node_heap_mb"]
+        parts.append(f'-e NODE_OPTIONS="--max-old-space-size=${{{NODE_HEAP_ENV}:-{heap}}}"')
+    return parts
+
+
+def render_run_case(agents, lock):
     lines = []
     for index, agent in enumerate(agents, start=1):
-        parts = ['execute sudo docker run --rm -it -v "$(pwd):/app"']
+        build_args = shlex.quote(locked_build_args(agent["id"], lock))
+        parts = [
+            f"check_image {index} {agent['id']} {agent['image_dir']} {build_args} &&",
+            'execute sudo docker run --rm -it -v "$(pwd):/app"',
+        ]
         for mount in agent["run"]["mounts"]:
             mount_value = f'{mount["host"]}:{mount["container"]}'
             # Use double quotes for mounts to allow variable expansion
             parts.append(f'-v "{mount_value}"')
         for env_var in agent["run"]["env_vars"]:
             parts.append(f"-e {env_var}=\"${{{env_var}}}\"")
+        parts.extend(render_resource_flags(agent["run"].get("resources", {})))
         parts.extend(shlex.quote(arg) for arg in agent["run"]["docker_args"])
         parts.append(shlex.quote(f'{agent["id"]}:latest'))
         parts.extend(shlex.quote(arg) for arg in agent["run"]["command_args"])
@@ -102,25 +320,32 @@ def render_run_case(agents):
     return "\n".join(lines)
 
 
-def render_build_case(agents):
+def render_build_command(agent, lock):
+    parts = ["execute docker build"]
+    parts.extend(shlex.quote(flag) for flag in build_flags(agent["id"], lock))
+    build_args = shlex.quote(locked_build_args(agent["id"], lock))
+    version = shlex.quote(image_version(agent, lock))
+    parts.append(f"$(image_labels {agent['image_dir']} {build_args} {version})")
+    parts.append(f"-t {agent['id']}:latest {agent['image_dir']}")
+    return " ".join(parts)
+
+
+def render_build_case(agents, lock):
     lines = []
     for index, agent in enumerate(agents, start=1):
-        lines.append(
-            f"        {index}) execute docker build --no-cache -t {agent['id']}:latest {agent['image_dir']} ;;"
-        )
+        lines.append(f"        {index}) {render_build_command(agent, lock)} ;;")
     lines.append('        *) echo "Unknown agent" ; exit 1 ;;')
     return "\n".join(lines)
 
 
-def render_rebuild_all_case(agents):
+def render_rebuild_all_case(agents, lock):
     total = len(agents)
     lines = []
     for index, agent in enumerate(agents, start=1):
         lines.append(f'    echo "[{index}/{total}] {agent["id"]}"')
-        image_dir = agent["image_dir"]
         agent_id = agent["id"]
         lines.append(
-            f'    execute docker build --no-cache -t {agent_id}:latest {image_dir}'
+            f'    {render_build_command(agent, lock)}'
             f' && succeeded+=("{agent_id}") || failed+=("{agent_id}")'
         )
     return "\n".join(lines)
@@ -138,7 +363,7 @@ def sync_readme(agents):
     README_PATH.write_text(updated)
 
 
-def sync_agent_sh(agents):
+def sync_agent_sh(agents, lock):
     text = AGENT_SH_PATH.read_text()
     updated = text
     updated = replace_section(
@@ -159,7 +384,7 @@ def sync_agent_sh(agents):
         updated,
         "# BEGIN GENERATED RUN CASE",
         "# END GENERATED RUN CASE",
-        render_run_case(agents),
+        render_run_case(agents, lock),
         AGENT_SH_PATH,
     )
     updated = replace_section(
@@ -173,14 +398,14 @@ def sync_agent_sh(agents):
         updated,
         "# BEGIN GENERATED BUILD CASE",
         "# END GENERATED BUILD CASE",
-        render_build_case(agents),
+        render_build_case(agents, lock),
         AGENT_SH_PATH,
     )
     updated = replace_section(
         updated,
         "# BEGIN GENERATED REBUILD ALL CASE",
         "# END GENERATED REBUILD ALL CASE",
-        render_rebuild_all_case(agents),
+        render_rebuild_all_case(agents, lock),
         AGENT_SH_PATH,
     )
     AGENT_SH_PATH.write_text(updated)
@@ -190,7 +415,7 @@ def main():
     agents = load_agents()
     validate_agents(agents)
     sync_readme(agents)
-    sync_agent_sh(agents)
+    sync_agent_sh(agents, load_lock())
     print(f"Synced metadata for {len(agents)} agents in README.md and agent.sh")
 
 
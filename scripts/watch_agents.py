@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Watch agents.json, agents/* and the prompt template and redo only the affected work.
+
+- agents.json changed: re-sync README.md/agent.sh, then regenerate the prompts of agents
+  whose manifest entries changed (or all prompts, if agent.sh itself changed, since every
+  prompt embeds it).
+- agents/<id>/ changed: rebuild <id> if the change is part of its build context (not docs),
+  and regenerate its prompt.
+- generate_prompt.py (which embeds the template) changed: regenerate all prompts.
+
+Changes are detected with inotify on Linux, falling back to polling elsewhere.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import shlex
+import struct
+import sys
+import time
+from pathlib import Path
+
+from make import execute
+from sync_agents import AGENT_SH_PATH, MANIFEST_PATH, ROOT, is_build_input
+
+
+AGENTS_DIR = ROOT / "agents"
+SCRIPTS_DIR = ROOT / "scripts"
+TEMPLATE_PATH = SCRIPTS_DIR / "generate_prompt.py"
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_relevant(path):
+    name = path.name
+    # Skip editor swap/backup/lock files: vim's .swp/.swx/.swo and "4913" write probe,
+    # emacs' #autosave# and .#lock files, and gedit's .goutputstream-* temp files.
+    # Other dotfiles (e.g. agents/<id>/.dockerignore) are build inputs and stay relevant.
+    if (
+        name.endswith(("~", ".swp", ".swx", ".swo"))
+        or name == "4913"
+        or name.startswith(("#", ".#", ".goutputstream-"))
+    ):
+        return False
+    return path in (MANIFEST_PATH, TEMPLATE_PATH) or AGENTS_DIR in path.parents
+
+
+class InotifyWatcher:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        # Watch directories rather than files so editors that save via rename are seen.
+        try:
+            self.watch(ROOT)
+            self.watch(SCRIPTS_DIR)
+            self.watch_tree(AGENTS_DIR)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        # Closing the inotify descriptor also removes all of its watches.
+        os.close(self.fd)
+
+    def watch(self, directory):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed for {directory}: {os.strerror(errno)}")
+        self.watches[wd] = directory
+
+    def watch_tree(self, directory):
+        self.watch(directory)
+        for dirpath, dirnames, _ in os.walk(directory):
+            for dirname in dirnames:
+                self.watch(Path(dirpath) / dirname)
+
+    def wait(self, timeout):
+        """Return the set of changed paths (empty on timeout); None means events were lost."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            directory = self.watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and AGENTS_DIR in path.parents:
+                self.watch_tree(path)
+            changed.add(path)
+        return changed
+
+
+class PollingWatcher:
+    def __init__(self, interval):
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    @staticmethod
+    def scan():
+        snapshot = {}
+        paths = [MANIFEST_PATH, TEMPLATE_PATH]
+        for dirpath, _, filenames in os.walk(AGENTS_DIR):
+            paths.extend(Path(dirpath) / filename for filename in filenames)
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval) if timeout is not None else self.interval)
+        current = self.scan()
+        changed = {
+            path for path in current.keys() | self.snapshot.keys()
+            if current.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = current
+        return changed
+
+
+def collect(watcher, debounce):
+    """Block until something changes, then keep collecting until `debounce` seconds pass quietly."""
+    changed = set()
+    overflow = False
+    while not changed and not overflow:
+        events = watcher.wait(None)
+        if events is None:
+            overflow = True
+        else:
+            changed = {path for path in events if is_relevant(path)}
+    while True:
+        events = watcher.wait(debounce)
+        if events is None:
+            overflow = True
+            continue
+        events = {path for path in events if is_relevant(path)}
+        if not events:
+            return changed, overflow
+        changed |= events
+
+
+def load_manifest_entries():
+    try:
+        with MANIFEST_PATH.open() as f:
+            return {agent["id"]: agent for agent in json.load(f)["agents"]}
+    except (OSError, ValueError, KeyError) as exc:
+        print(f"\033[1;31m[WATCH]\033[0m Cannot read {MANIFEST_PATH.name}: {exc}")
+        return None
+
+
+def prompt_command(prompt_dir, agent_ids=None):
+    cmd = f"python3 {shlex.quote(str(SCRIPTS_DIR / 'generate_prompt.py'))} --dir {shlex.quote(prompt_dir)}"
+    for agent_id in sorted(agent_ids or []):
+        cmd += f" --agent {shlex.quote(agent_id)}"
+    return cmd
+
+
+def handle(changed, overflow, manifest, args):
+    """Run the work affected by `changed`; return the manifest entries now in effect."""
+    rebuild = set()
+    prompts_for = set()
+    all_prompts = TEMPLATE_PATH in changed
+
+    for path in changed:
+        if AGENTS_DIR in path.parents:
+            agent_id, *rest = path.relative_to(AGENTS_DIR).parts
+            if (AGENTS_DIR / agent_id / "Dockerfile").exists():
+                if rest and is_build_input(Path(*rest)):
+                    rebuild.add(agent_id)
+                prompts_for.add(agent_id)
+
+    if overflow:
+        print("\033[1;33m[WATCH]\033[0m Event queue overflowed; re-syncing metadata.")
+    if MANIFEST_PATH in changed or overflow:
+        new_manifest = load_manifest_entries()
+        if new_manifest is None:
+            return manifest
+        agent_sh_before = AGENT_SH_PATH.read_text()
+        if execute(f"python3 {shlex.quote(str(SCRIPTS_DIR / 'sync_agents.py'))}").returncode != 0:
+            return manifest
+        if AGENT_SH_PATH.read_text() != agent_sh_before:
+            all_prompts = True
+        prompts_for |= {
+            agent_id for agent_id, entry in new_manifest.items()
+            if manifest.get(agent_id) != entry
+        }
+        manifest = new_manifest
+
+    known = set(manifest)
+    unknown = (rebuild | prompts_for) - known
+    if unknown:
+        print(f"\033[1;33m[WATCH]\033[0m Skipping agent(s) missing from agents.json: {', '.join(sorted(unknown))}")
+
+    if not args.no_build:
+        for agent_id in sorted(rebuild & known):
+            execute(f"python3 {shlex.quote(str(SCRIPTS_DIR / 'make.py'))} build {shlex.quote(agent_id)}")
+
+    if not args.no_prompts:
+        if all_prompts:
+            execute(prompt_command(args.prompt_dir))
+        elif prompts_for & known:
+            execute(prompt_command(args.prompt_dir, prompts_for & known))
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-sync, rebuild and regenerate prompts on change.")
+    parser.add_argument("--debounce", type=float, default=0.5, help="Quiet period in seconds (default: 0.5)")
+    parser.add_argument("--poll", action="store_true", help="Use polling instead of inotify")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds (default: 1.0)")
+    parser.add_argument("--no-build", action="store_true", help="Do not rebuild images of changed agents")
+    parser.add_argument("--no-prompts", action="store_true", help="Do not regenerate prompts")
+    parser.add_argument(
+        "--prompt-dir",
+        default="code_agent_docker_prompts",
+        help="Output directory for regenerated prompts (default: code_agent_docker_prompts)",
+    )
+    args = parser.parse_args()
+
+    watcher = None
+    if not args.poll and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher()
+        except (OSError, AttributeError) as exc:
+            print(f"inotify unavailable ({exc}); falling back to polling.")
+    if watcher is None:
+        watcher = PollingWatcher(args.interval)
+
+    manifest = load_manifest_entries() or {}
+    mode = "polling" if isinstance(watcher, PollingWatcher) else "inotify"
+    print(f"Watching agents.json, agents/ and the prompt template ({mode}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            try:
+                changed, overflow = collect(watcher, args.debounce)
+            except OSError as exc:
+                if not isinstance(watcher, InotifyWatcher):
+                    raise
+                # Typically the per-user inotify watch limit; new directories would go unwatched.
+                print(f"\033[1;33m[WATCH]\033[0m {exc}; falling back to polling.")
+                watcher.close()
+                watcher = PollingWatcher(args.interval)
+                manifest = handle(set(), True, manifest, args)
+                continue
+            for path in sorted(changed):
+                print(f"\033[1;34m[CHANGED]\033[0m {path.relative_to(ROOT)}")
+            manifest = handle(changed, overflow, manifest, args)
+    except KeyboardInterrupt:
+        print()
+
+
+if __name__ == "__main__":
+    main()